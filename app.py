@@ -3,9 +3,14 @@ This module sets up and runs a file change monitoring system that listens for ch
 in a specified directory and processes messages via a message broker. 
 """
 import os
-import time
+import threading
 
-from watchdog.observers import Observer
+try:
+    # Use the inotify backend directly on Linux so uninteresting events are
+    # dropped as early as possible.
+    from watchdog.observers.inotify import InotifyObserver as Observer
+except ImportError:
+    from watchdog.observers import Observer
 
 from message_broker.broker import MessageBroker, Consumer
 from file_monitor.monitor import FileChangeMonitor
@@ -50,11 +55,14 @@ def setup_file_monitoring(broker, consumer, root_path, directory_to_watch):
 
 def start_consumer_listener():
     """
-    Start the consumer listener to process messages indefinitely.
+    Start the consumer listener, blocking until interrupted.
+
+    Waits on an event that is never set instead of polling in a sleep
+    loop, so the process stays idle with zero wakeups until a signal
+    (e.g. KeyboardInterrupt) arrives.
     """
     print("Listening for messages...")
-    while True:
-        time.sleep(1)
+    threading.Event().wait()
 
 
 def main():
@@ -5,18 +5,57 @@ message broker, and logs file changes for auditing purposes.
 """
 
 import os
+import atexit
 import difflib
-from datetime import datetime
+import hashlib
+import io
+import mmap
+import queue
+import threading
+import time
+from collections import OrderedDict
 
-from watchdog.events import FileSystemEventHandler
+from watchdog.events import PatternMatchingEventHandler
 
+try:
+    import diff_match_patch
+except ImportError:
+    diff_match_patch = None
 
-class FileChangeMonitor(FileSystemEventHandler):
+
+class FileChangeMonitor(PatternMatchingEventHandler):
     """
     Monitors file changes in a directory and handles events such as file modifications.
     Publishes file change events to a broker and logs file changes for auditing.
+
+    Directory events and editor temp/backup artifacts are filtered out by
+    the pattern-matching dispatch before they reach the handler methods.
     """
 
+    # Editor temp, swap and backup files whose events are never interesting.
+    ignore_file_patterns = ["*~", ".#*", "*.swp", "*.swx", "*.tmp"]
+
+    # Write the audit log in batches of up to this many entries; the writer
+    # thread waits this long for further entries before closing a batch.
+    audit_flush_every = 50
+    audit_batch_timeout = 0.05
+
+    # Keep at most this many previous file versions resident, and never
+    # cache the contents of files larger than this many bytes.
+    version_cache_entries = 256
+    max_cached_bytes = 256 * 1024
+
+    # Bound the per-path stat and topic caches; entries are tiny but the
+    # watched tree may not be.
+    path_cache_entries = 4096
+
+    # Coalesce modification events for a path until it has been quiet for
+    # this many seconds; editor saves often fire many events in one burst.
+    debounce_window = 0.05
+
+    # Memory-map files at least this large instead of read()ing them.
+    mmap_threshold = 64 * 1024
+
     def __init__(self, broker, consumer, audit_log_path="file_change_audit.log"):
         """
         Initializes the file change monitor.
@@ -26,26 +65,99 @@ class FileChangeMonitor(FileSystemEventHandler):
             consumer: The consumer object for handling messages.
             audit_log_path (str): Path to the audit log file for recording file change events.
         """
-        self.file_versions = {}
+        super().__init__(ignore_patterns=self.ignore_file_patterns,
+                         ignore_directories=True, case_sensitive=True)
+        self.file_versions = OrderedDict()
         self.broker = broker
         self.consumer = consumer
         self.audit_log_path = audit_log_path
         self.root_path = os.getenv("FILE_SERVER_ROOT_PATH")
+        self._topic_cache = OrderedDict()
+        self._stat_cache = OrderedDict()
+        self._pending = {}
+        self._pending_cv = threading.Condition()
+        self._debounce_thread = None
+        self._ts_cached_second = None
+        self._ts_cached_str = ""
+        self._audit_fd = None
+        self._audit_q = queue.SimpleQueue()
+        self._audit_thread = None
+        atexit.register(self.close)
 
     def on_modified(self, event):
         """
         Handles the event when a file is modified.
 
+        Directory events never reach this method; the pattern-matching
+        dispatch drops them along with ignored file patterns.
+
+        Events are not processed inline: the path is recorded as pending and
+        a background worker runs the publish/audit pipeline once the path
+        has been quiet for `debounce_window` seconds, so a burst of events
+        for one save is handled once.
+
         Args:
             event: The event object containing details about the file change.
         """
-        if event.is_directory:
-            return
-        # Publish the file change event to the broker
         timestamp = self._get_current_timestamp()
-        self.publish_file_change(event.src_path, timestamp)
-        # Log the file change for auditing
-        self.audit_change_log(timestamp, event.src_path)
+        with self._pending_cv:
+            self._pending[event.src_path] = (time.monotonic(), timestamp)
+            if self._debounce_thread is None:
+                self._debounce_thread = threading.Thread(
+                    target=self._debounce_worker, daemon=True)
+                self._debounce_thread.start()
+            self._pending_cv.notify()
+
+    def _debounce_worker(self):
+        """
+        Drains pending modification events once their burst has gone quiet.
+        """
+        while True:
+            with self._pending_cv:
+                while not self._pending:
+                    self._pending_cv.wait()
+            time.sleep(self.debounce_window)
+            self._flush_due_events()
+
+    def _flush_due_events(self, now=None):
+        """
+        Runs the publish/audit pipeline for paths whose last event is older
+        than the debounce window.
+
+        The changes flushed together are published as one batch, so the
+        broker resolves subscribers once per topic for the whole burst.
+
+        Args:
+            now (float): The current monotonic time; defaults to
+                time.monotonic().
+
+        Returns:
+            bool: True if any pending event was processed.
+        """
+        if now is None:
+            now = time.monotonic()
+        due = []
+        with self._pending_cv:
+            for path, (last_seen, timestamp) in list(self._pending.items()):
+                if now - last_seen >= self.debounce_window:
+                    due.append((path, timestamp))
+                    del self._pending[path]
+        batch = []
+        for path, timestamp in due:
+            try:
+                item = self._build_change_message(path, timestamp)
+            except (OSError, ValueError):
+                # The file can vanish or be truncated between the event and
+                # the flush (temp files, atomic replaces, git checkouts);
+                # skip it rather than let the worker thread die.
+                print(f"Skipping unreadable file: {path}")
+                item = None
+            if item is not None:
+                batch.append(item)
+            self.audit_change_log(timestamp, path)
+        if batch:
+            self.broker.publish_many(batch)
+        return bool(due)
 
     def publish_file_change(self, file_path, timestamp):
         """
@@ -55,70 +167,258 @@ class FileChangeMonitor(FileSystemEventHandler):
             file_path (str): The path of the modified file.
             timestamp (str): The timestamp of the file change.
         """
+        item = self._build_change_message(file_path, timestamp)
+        if item is None:
+            return
+        self.broker.publish(*item)
+
+    def _build_change_message(self, file_path, timestamp):
+        """
+        Builds the (topic, message) pair for a file change event.
+
+        Args:
+            file_path (str): The path of the modified file.
+            timestamp (str): The timestamp of the file change.
+
+        Returns:
+            tuple: The (topic, message) pair, or None if the content is
+            unchanged.
+        """
         file_diff = self.get_file_diff(file_path)
+        if file_diff is None:
+            return None
         topic = self._generate_topic_from_file_path(file_path)
-        self.broker.publish(topic, f"Timestamp: {timestamp}\nDiff:\n{file_diff}")
+        return topic, f"Timestamp: {timestamp}\nDiff:\n{file_diff}"
 
     def get_file_diff(self, file_path):
         """
         Generates a diff of the modified file compared to its previous version.
 
+        The file's (mtime, size) pair is checked first, so duplicate events
+        for the same save are dismissed with a single stat syscall before
+        any read happens.
+
+        The file is read once as bytes — memory-mapped when it is at least
+        `mmap_threshold` bytes, avoiding read()'s staging buffer — and
+        stored alongside a content hash;
+        when a modification event fires but the hash is unchanged (a
+        spurious event), the diff is skipped entirely. Stored versions are
+        kept in an LRU bounded by `version_cache_entries`, and files larger
+        than `max_cached_bytes` are never cached, so memory stays bounded
+        however many files are touched.
+
         Args:
             file_path (str): The path of the modified file.
 
         Returns:
-            str: The diff of the file.
+            str: The diff of the file, or None if the content is unchanged.
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as fp:
-                current_content = fp.readlines()
+            stat = os.stat(file_path)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat_key = None
+        if stat_key is not None and self._stat_cache.get(file_path) == stat_key:
+            self._stat_cache.move_to_end(file_path)
+            return None
+
+        with open(file_path, 'rb') as fp:
+            if stat_key is not None and stat.st_size >= self.mmap_threshold:
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    data = bytes(mapped)
+            else:
+                data = fp.read()
+        if stat_key is not None:
+            self._stat_cache[file_path] = stat_key
+            self._stat_cache.move_to_end(file_path)
+            if len(self._stat_cache) > self.path_cache_entries:
+                self._stat_cache.popitem(last=False)
+
+        digest = hashlib.sha1(data).digest()
+        previous = self.file_versions.get(file_path)
+        if previous is not None and previous[0] == digest:
+            self.file_versions.move_to_end(file_path)
+            return None
+        if len(data) > self.max_cached_bytes:
+            self.file_versions.pop(file_path, None)
+        else:
+            self.file_versions[file_path] = (digest, data)
+            self.file_versions.move_to_end(file_path)
+            if len(self.file_versions) > self.version_cache_entries:
+                evicted_path, _ = self.file_versions.popitem(last=False)
+                self._stat_cache.pop(evicted_path, None)
+
+        try:
+            current_content = data.decode('utf-8').splitlines(keepends=True)
+            previous_content = (previous[1].decode('utf-8').splitlines(keepends=True)
+                                if previous is not None else None)
         except UnicodeDecodeError:
             return "Unable to file diff (binary or unsupported format)"
 
-        previous_content = self.file_versions.get(file_path)
-
         if previous_content:
-            diff = difflib.unified_diff(previous_content,
-                                        current_content,
-                                        fromfile='previous',
-                                        tofile='current',
-                                        lineterm='')
-            file_diff = '\n'.join(diff)
+            file_diff = self._diff_contents(previous_content, current_content)
         else:
             file_diff = f"New content\n++ {'\n'.join(current_content)}"
-        self.file_versions[file_path] = current_content
 
         return file_diff
 
+    def _diff_contents(self, previous_content, current_content):
+        """
+        Computes a diff between the previous and current file contents.
+
+        Uses the diff-match-patch library in line mode when installed: the
+        texts are collapsed to one character per unique line first, so the
+        diff runs over line tokens instead of individual characters.
+        Otherwise falls back to the difflib unified diff, whose output is
+        streamed into a string buffer as the generator produces it rather
+        than being collected into an intermediate list first.
+
+        Args:
+            previous_content (list): The previous content as a list of lines.
+            current_content (list): The current content as a list of lines.
+
+        Returns:
+            str: The diff of the file.
+        """
+        if diff_match_patch is not None:
+            dmp = diff_match_patch.diff_match_patch()
+            previous_text = ''.join(previous_content)
+            current_text = ''.join(current_content)
+            lined_previous, lined_current, line_array = dmp.diff_linesToChars(
+                previous_text, current_text)
+            diffs = dmp.diff_main(lined_previous, lined_current, False)
+            dmp.diff_charsToLines(diffs, line_array)
+            dmp.diff_cleanupSemantic(diffs)
+            return dmp.patch_toText(dmp.patch_make(diffs))
+        diff = difflib.unified_diff(previous_content,
+                                    current_content,
+                                    fromfile='previous',
+                                    tofile='current',
+                                    lineterm='')
+        buffer = io.StringIO()
+        for line in diff:
+            if buffer.tell():
+                buffer.write('\n')
+            buffer.write(line)
+        return buffer.getvalue()
+
     def audit_change_log(self, timestamp, file_path):
         """
         Appends a log entry for a file change to the audit log file.
 
+        The entry is only enqueued here; a dedicated writer thread batches
+        entries and submits each batch with a single writev call, keeping
+        file I/O entirely off the event-handling path.
+
         Args:
             timestamp (str): The timestamp of the file change.
             file_path (str): The path of the modified file.
         """
-        log_entry = f"{timestamp}, {file_path}\n"
-        with open(self.audit_log_path, "a", encoding='utf-8') as log_file:
-            log_file.write(log_entry)
+        if self._audit_thread is None:
+            self._audit_thread = threading.Thread(target=self._audit_worker,
+                                                  daemon=True)
+            self._audit_thread.start()
+        self._audit_q.put_nowait(f"{timestamp}, {file_path}\n".encode('utf-8'))
+
+    def _audit_worker(self):
+        """
+        Drains the audit queue, writing entries in batches.
+
+        Blocks until an entry arrives, then collects up to
+        `audit_flush_every` entries, waiting at most `audit_batch_timeout`
+        seconds for each additional one, and writes the batch at once.
+        """
+        while True:
+            entries = [self._audit_q.get()]
+            while len(entries) < self.audit_flush_every:
+                try:
+                    entries.append(self._audit_q.get(timeout=self.audit_batch_timeout))
+                except queue.Empty:
+                    break
+            self._write_audit_entries(entries)
+
+    def _write_audit_entries(self, entries):
+        """
+        Writes a batch of audit entries to the log file.
+
+        Entries are written in chunks of at most `audit_flush_every`, so
+        the iovec stays well under the kernel's IOV_MAX limit even when
+        close() drains a long queue in one call.
+
+        Args:
+            entries (list): The encoded log entries to write.
+        """
+        if self._audit_fd is None:
+            self._audit_fd = os.open(self.audit_log_path,
+                                     os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                                     0o644)
+        for start in range(0, len(entries), self.audit_flush_every):
+            os.writev(self._audit_fd, entries[start:start + self.audit_flush_every])
+
+    def close(self):
+        """
+        Flushes pending events, writes any queued audit log entries, and
+        closes the log file.
+
+        Events still waiting out the debounce window are published and
+        audited first, so changes that arrived just before shutdown are
+        not lost.
+        """
+        self._flush_due_events(now=time.monotonic() + self.debounce_window)
+        entries = []
+        while True:
+            try:
+                entries.append(self._audit_q.get_nowait())
+            except queue.Empty:
+                break
+        if entries:
+            self._write_audit_entries(entries)
+        if self._audit_fd is not None:
+            os.close(self._audit_fd)
+            self._audit_fd = None
 
     def _get_current_timestamp(self):
         """
         Retrieves the current timestamp.
 
+        The formatted string is cached per second, so a burst of events
+        within the same second pays for strftime only once.
+
         Returns:
             str: The current timestamp in 'YYYY-MM-DD HH:MM:SS' format.
         """
-        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        second = int(time.time())
+        if second != self._ts_cached_second:
+            self._ts_cached_str = time.strftime('%Y-%m-%d %H:%M:%S',
+                                                time.localtime(second))
+            self._ts_cached_second = second
+        return self._ts_cached_str
 
     def _generate_topic_from_file_path(self, file_path):
         """
         Generates a topic string based on the file path relative to the root path.
 
+        Paths recur constantly under a watched directory, so generated
+        topics are memoized in an LRU bounded by `path_cache_entries`; on a
+        cache miss, paths directly under the root are sliced instead of
+        going through os.path.relpath.
+
         Args:
             file_path (str): The full path of the file.
 
         Returns:
             str: The relative topic string.
         """
-        return os.path.relpath(file_path, self.root_path)
+        topic = self._topic_cache.get(file_path)
+        if topic is None:
+            root_prefix = self.root_path + os.sep if self.root_path else None
+            if root_prefix and file_path.startswith(root_prefix):
+                topic = file_path[len(root_prefix):]
+            else:
+                topic = os.path.relpath(file_path, self.root_path)
+            self._topic_cache[file_path] = topic
+            if len(self._topic_cache) > self.path_cache_entries:
+                self._topic_cache.popitem(last=False)
+        else:
+            self._topic_cache.move_to_end(file_path)
+        return topic
@@ -7,10 +7,19 @@ It includes:
 2. `Producer`: Publishes messages to topics via the `MessageBroker`.
 3. `Consumer`: Subscribes to topics and receives messages.
 
-The system allows producers to publish messages and consumers to subscribe to topics, 
+The system allows producers to publish messages and consumers to subscribe to topics,
 with wildcard support for flexible topic matching.
 """
 
+import queue
+import re
+import threading
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
 
 class MessageBroker:
     """
@@ -20,15 +29,29 @@ class MessageBroker:
 
     def __init__(self):
         """
-        This constructor sets up an empty dictionary to store the subscriptions, 
+        This constructor sets up an empty dictionary to store the subscriptions,
         where each key is a topic and each value is a list of consumers subscribed to that topic.
+        It also sets up the exact-match and prefix-trie indexes used to match
+        topics without scanning every subscription, and the lock that
+        serializes subscription changes.
         """
         self.subscriptions = {}
+        self._exact = {}
+        self._prefix_trie = {}
+        self._parsed = {}
+        self._wild_subs = {}
+        self._mutate_lock = threading.Lock()
+        self._hs_state = None
+        self._hs_dirty = True
 
     def subscribe(self, consumer, topic):
         """
         Subscribes a consumer to a given topic.
 
+        Subscription changes are serialized by a lock; the matching indexes
+        hold immutable consumer tuples that are swapped in atomically, so
+        concurrent publishers read them without taking any lock.
+
         Args:
             consumer (Consumer): The consumer object to subscribe.
             topic (str): The topic to which the consumer is subscribing.
@@ -38,9 +61,11 @@ class MessageBroker:
         """
         if not self._is_valid_topic(topic):
             raise ValueError(f"Invalid topic: {topic}")
-        if topic not in self.subscriptions:
-            self.subscriptions[topic] = []
-        self.subscriptions[topic].append(consumer)
+        with self._mutate_lock:
+            if topic not in self.subscriptions:
+                self.subscriptions[topic] = []
+            self.subscriptions[topic].append(consumer)
+            self._index_subscription(topic, self._receiver_tuple(topic))
 
     def unsubscribe(self, consumer, topic):
         """
@@ -54,15 +79,29 @@ class MessageBroker:
             KeyError: If the topic does not exist in the subscriptions.
             ValueError: If the consumer is not subscribed to the topic.
         """
-        if topic in self.subscriptions:
-            self.subscriptions[topic].remove(consumer)
-            if not self.subscriptions[topic]:
-                del self.subscriptions[topic]
+        with self._mutate_lock:
+            if topic in self.subscriptions:
+                self.subscriptions[topic].remove(consumer)
+                if not self.subscriptions[topic]:
+                    del self.subscriptions[topic]
+                    self._deindex_subscription(topic)
+                else:
+                    self._index_subscription(topic, self._receiver_tuple(topic))
 
     def publish(self, topic, message):
         """
         Publishes a message to a given topic, notifying all matching subscribers.
 
+        Exact subscriptions are found with one dictionary lookup. Wildcard
+        subscriptions are matched with a single Hyperscan scan of the topic
+        when the `hyperscan` package is installed, or by walking the prefix
+        trie along the topic otherwise, so matching costs O(len(topic))
+        instead of O(subscriptions).
+
+        Publishing takes no lock: the indexes hold immutable consumer
+        tuples that subscription changes replace atomically, so concurrent
+        publishers never block each other.
+
         Args:
             topic (str): The topic to which the message is published.
             message (str): The message to be delivered to the subscribers.
@@ -72,37 +111,212 @@ class MessageBroker:
         """
         if not self._is_valid_topic(topic):
             raise ValueError(f"Invalid topic: {topic}")
-        for subscription, consumers in self.subscriptions.items():
-            if self._matches(subscription, topic):
-                for consumer in consumers:
-                    consumer.receive_message(topic, message)
+        for receiver in self._match_receivers(topic):
+            receiver(topic, message)
 
-    def list_subscriptions(self):
+    def publish_many(self, items):
         """
-        Lists all current subscriptions and their subscribers.
+        Publishes a batch of messages, resolving each unique topic's
+        subscribers only once.
+
+        Bursty producers can hand over their whole backlog here so the
+        matching cost is amortized across every message that shares a
+        topic.
+
+        Every topic is validated before anything is delivered, so an
+        invalid entry anywhere in the batch rejects the whole batch rather
+        than leaving it half-applied.
+
+        Args:
+            items (list): (topic, message) pairs to deliver in order.
+
+        Raises:
+            ValueError: If any topic is invalid.
+        """
+        is_valid_topic = self._is_valid_topic
+        for topic, _ in items:
+            if not is_valid_topic(topic):
+                raise ValueError(f"Invalid topic: {topic}")
+        matched = {}
+        matched_get = matched.get
+        match_receivers = self._match_receivers
+        for topic, message in items:
+            receivers = matched_get(topic)
+            if receivers is None:
+                receivers = match_receivers(topic)
+                matched[topic] = receivers
+            for receiver in receivers:
+                receiver(topic, message)
+
+    def _receiver_tuple(self, topic):
+        """
+        Builds the immutable tuple of receive callables for a topic.
+
+        Binding consumer.receive_message once here means the fanout loop
+        in publish calls a flat tuple of callables with no per-message
+        attribute lookup or consumer dereference.
+
+        Args:
+            topic (str): The subscription topic.
 
         Returns:
-            dict: A dictionary where keys are topics and values are lists of subscriber names.
+            tuple: The bound receive_message methods of the subscribers.
         """
-        return {topic: [consumer.name for consumer in consumers]
-                for topic, consumers in self.subscriptions.items()}
+        return tuple(consumer.receive_message
+                     for consumer in self.subscriptions[topic])
+
+    def _match_receivers(self, topic):
+        """
+        Collects the receive callables of every subscription matching a topic.
+
+        This is the dispatch hot loop, so the dict and list methods it
+        drives are hoisted into locals to keep per-character work down to
+        plain calls with no repeated attribute lookups.
+
+        Args:
+            topic (str): The topic being published.
+
+        Returns:
+            list: The matching receive callables, exact subscribers first.
+        """
+        receivers = list(self._exact.get(topic, ()))
+        if hyperscan is not None:
+            receivers.extend(self._match_wildcards_dfa(topic))
+            return receivers
+        node_get = dict.get
+        extend = receivers.extend
+        node = self._prefix_trie
+        extend(node_get(node, "$subs", ()))
+        for char in topic:
+            node = node_get(node, char)
+            if node is None:
+                break
+            extend(node_get(node, "$subs", ()))
+        return receivers
+
+    def _match_wildcards_dfa(self, topic):
+        """
+        Collects wildcard subscribers for a topic via the Hyperscan database.
+
+        The database is recompiled lazily after subscribe/unsubscribe marks
+        it dirty, so publishes between subscription changes pay only the
+        single scan.
+
+        Args:
+            topic (str): The topic being published.
 
-    def _matches(self, subscription, topic):
+        Returns:
+            list: The receive callables of every matching wildcard
+            subscription.
+        """
+        if self._hs_dirty:
+            self._compile_wildcard_db()
+        state = self._hs_state
+        if state is None:
+            return []
+        topics, database = state
+        matched = []
+        database.scan(topic.encode('utf-8'),
+                      match_event_handler=lambda pat_id, *_: matched.append(pat_id))
+        receivers = []
+        for pat_id in matched:
+            receivers.extend(self._wild_subs.get(topics[pat_id], ()))
+        return receivers
+
+    def _compile_wildcard_db(self):
         """
-        Checks if a topic matches a subscription with wildcard support.
+        Compiles all wildcard prefixes into a single Hyperscan database.
+
+        Runs entirely under the mutation lock, and the topics list and
+        fully compiled database are published together as one tuple
+        assignment, so a concurrent publisher either sees the complete old
+        state or the complete new one — never a half-built database or a
+        topics list from a different compile.
+        """
+        with self._mutate_lock:
+            if not self._hs_dirty:
+                return
+            wildcards = [(topic, prefix)
+                         for topic, (prefix, is_wildcard) in self._parsed.items()
+                         if is_wildcard]
+            if not wildcards:
+                state = None
+            else:
+                # HS_FLAG_ALLOWEMPTY lets the bare "~" subscription compile:
+                # its prefix is empty, and Hyperscan otherwise rejects
+                # patterns that match the empty buffer.
+                flags = hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_ALLOWEMPTY
+                database = hyperscan.Database()
+                database.compile(
+                    expressions=[b"^" + re.escape(prefix).encode('utf-8')
+                                 for _, prefix in wildcards],
+                    ids=list(range(len(wildcards))),
+                    flags=[flags] * len(wildcards))
+                state = ([topic for topic, _ in wildcards], database)
+            self._hs_state = state
+            self._hs_dirty = False
+
+    def _index_subscription(self, topic, receivers):
+        """
+        Adds a subscription's receivers to the matching index.
+
+        The topic is split on the wildcard once here and the resulting
+        (prefix, is_wildcard) pair is cached, so no later operation has to
+        re-parse the subscription string. The receiver tuple replaces any
+        previous one atomically, which is what lets publish read the index
+        without locking.
 
         Args:
-            subscription (str): The subscription string, which may include a wildcard (~).
-            topic (str): The topic string to be matched.
+            topic (str): The subscription topic, which may include a wildcard (~).
+            receivers (tuple): The bound receive callables of the topic's
+                current subscribers.
+        """
+        if topic in self._parsed:
+            prefix, is_wildcard = self._parsed[topic]
+        else:
+            parts = topic.split("~", 1)
+            prefix, is_wildcard = parts[0], len(parts) == 2
+            self._parsed[topic] = (prefix, is_wildcard)
+            if is_wildcard:
+                self._hs_dirty = True
+        if not is_wildcard:
+            self._exact[topic] = receivers
+        else:
+            node = self._prefix_trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node["$subs"] = receivers
+            self._wild_subs[topic] = receivers
+
+    def _deindex_subscription(self, topic):
+        """
+        Removes a subscription's receivers from the matching index.
+
+        Args:
+            topic (str): The subscription topic, which may include a wildcard (~).
+        """
+        prefix, is_wildcard = self._parsed.pop(topic)
+        if not is_wildcard:
+            del self._exact[topic]
+        else:
+            self._wild_subs.pop(topic, None)
+            self._hs_dirty = True
+            node = self._prefix_trie
+            for char in prefix:
+                node = node.get(char)
+                if node is None:
+                    return
+            node.pop("$subs", None)
+
+    def list_subscriptions(self):
+        """
+        Lists all current subscriptions and their subscribers.
 
         Returns:
-            bool: True if the topic matches the subscription, otherwise False.
+            dict: A dictionary where keys are topics and values are lists of subscriber names.
         """
-        parts = subscription.split("~", 1)
-        if len(parts) == 1:
-            return subscription == topic
-        prefix = parts[0]
-        return topic.startswith(prefix)
+        return {topic: [consumer.name for consumer in consumers]
+                for topic, consumers in self.subscriptions.items()}
 
     def _is_valid_topic(self, topic):
         """
@@ -144,6 +358,10 @@ class Producer:
 class Consumer:
     """
     A consumer that subscribes to topics and receives messages from a message broker.
+
+    Messages are delivered through an inbox queue drained by the consumer's
+    own thread, so a slow consumer never blocks the publisher or the other
+    subscribers.
     """
 
     def __init__(self, name):
@@ -153,18 +371,39 @@ class Consumer:
         """
         self.name = name
         self.messages = []
+        self.inbox = queue.Queue()
+        self._drain_thread = threading.Thread(target=self._drain, daemon=True)
+        self._drain_thread.start()
 
     def receive_message(self, topic, message):
         """
-        Receives a message from a topic and stores it.
+        Queues a message from a topic for processing on the drain thread.
+
+        This is the method the broker calls during publish; it only
+        enqueues, so publishing costs O(1) per subscriber and never blocks.
 
         Args:
             topic (str): The topic from which the message was received.
             message (str): The message content.
         """
-        self.messages.append((topic, message))
-        print("Message recived...")
-        print(f"Topic: {topic}, Message: {message}")
+        self.inbox.put_nowait((topic, message))
+
+    def _drain(self):
+        """
+        Processes queued messages, storing and printing each one.
+        """
+        while True:
+            topic, message = self.inbox.get()
+            self.messages.append((topic, message))
+            print("Message recived...")
+            print(f"Topic: {topic}, Message: {message}")
+            self.inbox.task_done()
+
+    def join(self):
+        """
+        Blocks until every queued message has been processed.
+        """
+        self.inbox.join()
 
     def subscribe(self, broker, topic):
         """
@@ -41,13 +41,15 @@ class TestFileMonitorApp(unittest.TestCase):
         )
         self.assertIs(observer, mock_observer.return_value)
 
-    @patch('time.sleep', side_effect=KeyboardInterrupt)
-    def test_start_consumer_listener(self, mock_sleep):
-        """Test the consumer listener loop."""
+    @patch('app.threading.Event')
+    def test_start_consumer_listener(self, mock_event):
+        """Test the consumer listener blocks on the event until interrupted."""
+        mock_event.return_value.wait.side_effect = KeyboardInterrupt
+
         with self.assertRaises(KeyboardInterrupt):
             start_consumer_listener()
 
-        mock_sleep.assert_called()
+        mock_event.return_value.wait.assert_called_once()
 
     @patch('app.setup_message_broker')
     @patch('app.setup_file_monitoring')
@@ -1,7 +1,30 @@
+import re
 import unittest
+from unittest.mock import patch
 
 from message_broker.broker import MessageBroker, Producer, Consumer
 
+
+class _FakeHyperscan:
+    """Minimal stand-in for the hyperscan module, matching with re."""
+
+    HS_FLAG_SINGLEMATCH = 1
+    HS_FLAG_ALLOWEMPTY = 2
+
+    class Database:
+        """Records compiled patterns and scans them with re.match."""
+
+        def compile(self, expressions, ids, flags):
+            self.expressions = expressions
+            self.ids = ids
+            self.flags = flags
+
+        def scan(self, data, match_event_handler):
+            for pat_id, expression in zip(self.ids, self.expressions):
+                if re.match(expression, data):
+                    match_event_handler(pat_id, 0, 0, 0, None)
+
+
 class TestMessageBroker(unittest.TestCase):
     """Test Cases for Message Broker"""
 
@@ -12,10 +35,16 @@ class TestMessageBroker(unittest.TestCase):
         self.consumer = Consumer("TestConsumer")
         self.consumer2 = Consumer("NewConsumer")
 
+    def _wait_for_delivery(self):
+        """Blocks until both consumers have drained their inboxes."""
+        self.consumer.join()
+        self.consumer2.join()
+
     def test_simple_subscription(self):
         """Tests subscribing to a topic and receiving a message."""
         self.consumer.subscribe(self.broker, "topicA")
         self.producer.publish("topicA", "Message1")
+        self._wait_for_delivery()
         self.assertEqual(self.consumer.messages, [("topicA", "Message1")])
 
     def test_wildcard_subscription(self):
@@ -23,6 +52,7 @@ class TestMessageBroker(unittest.TestCase):
         self.consumer.subscribe(self.broker, "topic~")
         self.producer.publish("topicA", "Message1")
         self.producer.publish("topicB", "Message2")
+        self._wait_for_delivery()
         self.assertEqual(self.consumer.messages, [("topicA", "Message1"), ("topicB", "Message2")])
 
     def test_only_wildcard_subscription(self):
@@ -34,12 +64,14 @@ class TestMessageBroker(unittest.TestCase):
                                  ('topic4', 'Message 4')]
         for topic, message in topic_and_message_list:
             self.producer.publish(topic, message)
+        self._wait_for_delivery()
         self.assertEqual(self.consumer.messages, topic_and_message_list)
 
     def test_no_matching_subscription(self):
         """Tests subscription with no matching topics."""
         self.consumer.subscribe(self.broker, "topic~")
         self.producer.publish("anotherTopic", "Message1")
+        self._wait_for_delivery()
         self.assertEqual(self.consumer.messages, [])
 
     def test_multiple_consumer(self):
@@ -47,19 +79,67 @@ class TestMessageBroker(unittest.TestCase):
         self.consumer.subscribe(self.broker, "ab~")
         self.consumer2.subscribe(self.broker, "b~")
         self.producer.publish("abc", "Message1")
+        self._wait_for_delivery()
         self.assertEqual(self.consumer.messages, [("abc", "Message1")])
         self.assertEqual(self.consumer2.messages, [])
 
+    def test_nested_wildcard_subscriptions(self):
+        """Tests that a topic matches every wildcard prefix along its length."""
+        self.consumer.subscribe(self.broker, "topic~")
+        self.consumer2.subscribe(self.broker, "topic/sub~")
+        self.producer.publish("topic/sub/file.txt", "Message1")
+        self._wait_for_delivery()
+        self.assertEqual(self.consumer.messages, [("topic/sub/file.txt", "Message1")])
+        self.assertEqual(self.consumer2.messages, [("topic/sub/file.txt", "Message1")])
+
+    def test_unsubscribe_wildcard(self):
+        """Tests unsubscribing from a wildcard topic."""
+        self.consumer.subscribe(self.broker, "topic~")
+        self.producer.publish("topicA", "Message1")
+        self.broker.unsubscribe(self.consumer, "topic~")
+        self.producer.publish("topicA", "Message2")
+        self._wait_for_delivery()
+        self.assertEqual(self.consumer.messages, [("topicA", "Message1")])
+
+    def test_wildcard_matching_via_hyperscan_backend(self):
+        """Tests the DFA branch, including the empty-prefix "~" subscription."""
+        with patch('message_broker.broker.hyperscan', _FakeHyperscan):
+            self.consumer.subscribe(self.broker, "~")
+            self.consumer2.subscribe(self.broker, "topic~")
+            self.producer.publish("topicA", "Message1")
+            self.producer.publish("other", "Message2")
+            self._wait_for_delivery()
+
+        self.assertEqual(self.consumer.messages, [("topicA", "Message1"),
+                                                  ("other", "Message2")])
+        self.assertEqual(self.consumer2.messages, [("topicA", "Message1")])
+        _, database = self.broker._hs_state
+        expected_flags = (_FakeHyperscan.HS_FLAG_SINGLEMATCH
+                          | _FakeHyperscan.HS_FLAG_ALLOWEMPTY)
+        self.assertTrue(all(flag == expected_flags for flag in database.flags))
+
     def test_unsubscribe(self):
         """Tests unsubscribing from a topic."""
         self.consumer.subscribe(self.broker, "topicA")
         self.producer.publish("topicA", "Message1")
+        self._wait_for_delivery()
         self.assertEqual(self.consumer.messages, [("topicA", "Message1")])
 
         # Unsubscribe and publish again
         self.broker.unsubscribe(self.consumer, "topicA")
         self.producer.publish("topicA", "Message2")
+        self._wait_for_delivery()
+        self.assertEqual(self.consumer.messages, [("topicA", "Message1")])
+
+    def test_unsubscribe_one_of_many(self):
+        """Tests that remaining consumers still receive messages after an unsubscribe."""
+        self.consumer.subscribe(self.broker, "topicA")
+        self.consumer2.subscribe(self.broker, "topicA")
+        self.broker.unsubscribe(self.consumer2, "topicA")
+        self.producer.publish("topicA", "Message1")
+        self._wait_for_delivery()
         self.assertEqual(self.consumer.messages, [("topicA", "Message1")])
+        self.assertEqual(self.consumer2.messages, [])
 
     def test_invalid_subscription_topic(self):
         """Tests invalid subscription topics."""
@@ -72,6 +152,28 @@ class TestMessageBroker(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.consumer.subscribe(self.broker, 1234)
 
+    def test_publish_many(self):
+        """Tests batch publishing with shared topic matching."""
+        self.consumer.subscribe(self.broker, "topic~")
+        self.consumer2.subscribe(self.broker, "topicA")
+        self.broker.publish_many([("topicA", "Message1"),
+                                  ("topicA", "Message2"),
+                                  ("topicB", "Message3")])
+        self._wait_for_delivery()
+        self.assertEqual(self.consumer.messages, [("topicA", "Message1"),
+                                                  ("topicA", "Message2"),
+                                                  ("topicB", "Message3")])
+        self.assertEqual(self.consumer2.messages, [("topicA", "Message1"),
+                                                   ("topicA", "Message2")])
+
+    def test_publish_many_invalid_topic(self):
+        """Tests that a batch with an invalid topic delivers nothing at all."""
+        self.consumer.subscribe(self.broker, "topicA")
+        with self.assertRaises(ValueError):
+            self.broker.publish_many([("topicA", "Message1"), ("", "Message2")])
+        self._wait_for_delivery()
+        self.assertEqual(self.consumer.messages, [])
+
     def test_invalid_publish_topic(self):
         """Tests invalid publish topics."""
         with self.assertRaises(ValueError):
@@ -1,8 +1,14 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import time
 import unittest
-from datetime import datetime
 
 from unittest.mock import MagicMock, patch, mock_open
 
+from watchdog.events import DirModifiedEvent, FileModifiedEvent
+
 from file_monitor.monitor import FileChangeMonitor
 
 
@@ -25,36 +31,139 @@ class TestFileChangeMonitor(unittest.TestCase):
         expected_topic = "subdir/file.txt"
         self.assertEqual(self.handler._generate_topic_from_file_path(file_path), expected_topic)
 
-    @patch('file_monitor.monitor.datetime')
-    def test_get_current_timestamp(self, mock_datetime):
+    def test_generate_topic_is_memoized(self):
+        """Test that a repeated path reuses the cached topic."""
+        self.handler.root_path = "/root/path"
+
+        file_path = "/root/path/subdir/file.txt"
+        first = self.handler._generate_topic_from_file_path(file_path)
+        with patch('file_monitor.monitor.os.path.relpath') as mock_relpath:
+            second = self.handler._generate_topic_from_file_path(file_path)
+
+        self.assertEqual(first, second)
+        mock_relpath.assert_not_called()
+
+    @patch('file_monitor.monitor.time.time', return_value=1733490645.5)
+    def test_get_current_timestamp(self, mock_time):
         """Test if the current timestamp is formatted correctly."""
-        mock_datetime.now.return_value = datetime(2024, 12, 6, 12, 30, 45)
-        mock_datetime.now.strftime.return_value = '2024-12-06 12:30:45'
+        expected = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(1733490645))
 
         timestamp = self.handler._get_current_timestamp()
-        self.assertEqual(timestamp, '2024-12-06 12:30:45')
+        self.assertEqual(timestamp, expected)
+
+    @patch('file_monitor.monitor.time.time', return_value=1733490645.5)
+    def test_get_current_timestamp_cached_within_second(self, mock_time):
+        """Test that calls within the same second reuse the formatted string."""
+        first = self.handler._get_current_timestamp()
+        with patch('file_monitor.monitor.time.strftime') as mock_strftime:
+            second = self.handler._get_current_timestamp()
 
-    @patch('builtins.open', new_callable=mock_open, read_data="Line1\nLine2\n")
+        self.assertEqual(first, second)
+        mock_strftime.assert_not_called()
+
+    @patch('builtins.open', new_callable=mock_open, read_data=b"Line1\nLine2\n")
     def test_get_file_diff_with_no_previous_version(self, mock_file):
         """Test diff generation when there's no previous version of the file."""
         file_path = "file.txt"
-        self.handler.file_versions = {}
         expected_diff = "New content\n++ Line1\n\nLine2\n"
 
         diff = self.handler.get_file_diff(file_path)
         self.assertEqual(diff, expected_diff)
-        mock_file.assert_called_once_with(file_path, 'r', encoding='utf-8')
+        mock_file.assert_called_once_with(file_path, 'rb')
 
-    @patch('builtins.open', new_callable=mock_open, read_data="Line1\nLine2\n")
+    @patch('builtins.open', new_callable=mock_open, read_data=b"Line1\nLine2\n")
     def test_get_file_diff_with_previous_version(self, mock_file):
         """Test diff generation when there's a previous version of the file."""
         file_path = "file.txt"
-        self.handler.file_versions[file_path] = ["Line1\n", "LineOld\n"]
+        previous = b"Line1\nLineOld\n"
+        self.handler.file_versions[file_path] = (hashlib.sha1(previous).digest(), previous)
         expected_diff = "--- previous\n+++ current\n@@ -1,2 +1,2 @@\n Line1\n\n-LineOld\n\n+Line2\n"
 
         diff = self.handler.get_file_diff(file_path)
         self.assertEqual(diff, expected_diff)
-        mock_file.assert_called_once_with(file_path, 'r', encoding='utf-8')
+        mock_file.assert_called_once_with(file_path, 'rb')
+
+    @patch('builtins.open', new_callable=mock_open, read_data=b"Line1\nLine2\n")
+    def test_get_file_diff_skips_unchanged_content(self, mock_file):
+        """Test that the diff is skipped when the content hash is unchanged."""
+        file_path = "file.txt"
+        current = b"Line1\nLine2\n"
+        self.handler.file_versions[file_path] = (hashlib.sha1(current).digest(), current)
+
+        diff = self.handler.get_file_diff(file_path)
+        self.assertIsNone(diff)
+
+    @patch('builtins.open', new_callable=mock_open, read_data=b"Line1\nLine2\n")
+    def test_file_versions_evicts_least_recently_used(self, mock_file):
+        """Test that the version cache stays bounded by evicting old entries."""
+        self.handler.version_cache_entries = 2
+        for name in ("a.txt", "b.txt", "c.txt"):
+            self.handler.get_file_diff(name)
+
+        self.assertEqual(list(self.handler.file_versions), ["b.txt", "c.txt"])
+
+    @patch('builtins.open', new_callable=mock_open, read_data=b"Line1\nLine2\n")
+    def test_file_versions_skips_large_files(self, mock_file):
+        """Test that files over the size threshold are diffed but not cached."""
+        self.handler.max_cached_bytes = 4
+
+        diff = self.handler.get_file_diff("file.txt")
+        self.assertEqual(diff, "New content\n++ Line1\n\nLine2\n")
+        self.assertNotIn("file.txt", self.handler.file_versions)
+
+    @patch('file_monitor.monitor.os.stat')
+    @patch('builtins.open', new_callable=mock_open, read_data=b"Line1\nLine2\n")
+    def test_stat_cache_stays_bounded(self, mock_file, mock_stat):
+        """Test that the stat cache evicts old entries once over its cap."""
+        self.handler.path_cache_entries = 2
+        mock_stat.return_value = MagicMock(st_mtime_ns=1234, st_size=12)
+
+        for name in ("a.txt", "b.txt", "c.txt"):
+            self.handler.get_file_diff(name)
+
+        self.assertEqual(list(self.handler._stat_cache), ["b.txt", "c.txt"])
+
+    def test_topic_cache_stays_bounded(self):
+        """Test that the topic cache evicts old entries once over its cap."""
+        self.handler.path_cache_entries = 2
+        self.handler.root_path = "/root/path"
+
+        for name in ("a.txt", "b.txt", "c.txt"):
+            self.handler._generate_topic_from_file_path(f"/root/path/{name}")
+
+        self.assertEqual(list(self.handler._topic_cache),
+                         ["/root/path/b.txt", "/root/path/c.txt"])
+
+    def test_get_file_diff_uses_mmap_for_large_files(self):
+        """Test that files over the mmap threshold are memory-mapped."""
+        self.handler.mmap_threshold = 1
+        with tempfile.NamedTemporaryFile(suffix=".txt") as tmp:
+            tmp.write(b"Line1\nLine2\n")
+            tmp.flush()
+            with patch('file_monitor.monitor.mmap.mmap', wraps=mmap.mmap) as mock_mmap:
+                diff = self.handler.get_file_diff(tmp.name)
+
+        mock_mmap.assert_called_once()
+        self.assertEqual(diff, "New content\n++ Line1\n\nLine2\n")
+
+    @patch('file_monitor.monitor.os.stat')
+    @patch('builtins.open', new_callable=mock_open, read_data=b"Line1\nLine2\n")
+    def test_get_file_diff_stat_fast_path(self, mock_file, mock_stat):
+        """Test that duplicate events with unchanged stat skip the file read."""
+        mock_stat.return_value = MagicMock(st_mtime_ns=1234, st_size=12)
+
+        first = self.handler.get_file_diff("file.txt")
+        second = self.handler.get_file_diff("file.txt")
+
+        self.assertEqual(first, "New content\n++ Line1\n\nLine2\n")
+        self.assertIsNone(second)
+        mock_file.assert_called_once()
+
+    @patch('file_monitor.monitor.FileChangeMonitor.get_file_diff', return_value=None)
+    def test_publish_file_change_skips_unchanged_content(self, mock_get_file_diff):
+        """Test that nothing is published when the file content is unchanged."""
+        self.handler.publish_file_change("file.txt", "2024-12-06 12:30:45")
+        self.mock_broker.publish.assert_not_called()
 
     @patch('file_monitor.monitor.FileChangeMonitor.get_file_diff')
     @patch('file_monitor.monitor.FileChangeMonitor._get_current_timestamp')
@@ -71,20 +180,37 @@ class TestFileChangeMonitor(unittest.TestCase):
         message = "Timestamp: 2024-12-06 12:30:45\nDiff:\n--- diff ---"
         self.mock_broker.publish.assert_called_once_with(topic, message)
 
-    def test_on_modified_ignores_directories(self):
-        """Test that on_modified ignores directories."""
-        mock_event = MagicMock()
-        mock_event.is_directory = True
+    def test_dispatch_ignores_directories(self):
+        """Test that directory events are filtered before reaching the handler."""
+        self.handler.dispatch(DirModifiedEvent("/root/path/subdir"))
 
-        self.handler.on_modified(mock_event)
+        self.assertEqual(self.handler._pending, {})
         self.mock_broker.publish.assert_not_called()
 
-    @patch('file_monitor.monitor.FileChangeMonitor.publish_file_change')
+    def test_dispatch_ignores_editor_artifacts(self):
+        """Test that events for editor temp/swap files are filtered out."""
+        for name in ("/root/path/file.txt~", "/root/path/.#file.txt",
+                     "/root/path/file.txt.swp", "/root/path/file.tmp"):
+            self.handler.dispatch(FileModifiedEvent(name))
+
+        self.assertEqual(self.handler._pending, {})
+
+    def test_dispatch_records_file_modifications(self):
+        """Test that file modification events reach on_modified."""
+        self.handler.dispatch(FileModifiedEvent("/root/path/file.txt"))
+
+        self.assertIn("/root/path/file.txt", self.handler._pending)
+        # Clear the entry so the debounce worker does not try to read it.
+        with self.handler._pending_cv:
+            self.handler._pending.clear()
+
+    @patch('file_monitor.monitor.FileChangeMonitor._build_change_message',
+           return_value=("file.txt", "payload"))
     @patch('file_monitor.monitor.FileChangeMonitor.audit_change_log')
     def test_on_modified_calls_publish_and_audit_for_files(self,
                                     mock_audit_change_log,
-                                    mock_publish_file_change):
-        """Test that on_modified calls publish_file_change and audit_change_log for files."""
+                                    mock_build_change_message):
+        """Test that on_modified publishes the change and audits it for files."""
         mock_event = MagicMock()
         mock_event.is_directory = False
         mock_event.src_path = "file.txt"
@@ -92,17 +218,143 @@ class TestFileChangeMonitor(unittest.TestCase):
         with patch('file_monitor.monitor.FileChangeMonitor._get_current_timestamp',
                    return_value="2024-12-06 12:30:45"):
             self.handler.on_modified(mock_event)
+        self.handler._flush_due_events(now=time.monotonic() + self.handler.debounce_window)
 
-        mock_publish_file_change.assert_called_once_with("file.txt", "2024-12-06 12:30:45")
+        mock_build_change_message.assert_called_once_with("file.txt", "2024-12-06 12:30:45")
+        self.mock_broker.publish_many.assert_called_once_with([("file.txt", "payload")])
         mock_audit_change_log.assert_called_once_with("2024-12-06 12:30:45", "file.txt")
 
-    @patch('builtins.open', new_callable=mock_open)
-    def test_audit_change_log(self, mock_open):
-        """Test that audit_change_log writes the correct entry to the log file."""
+    @patch('file_monitor.monitor.FileChangeMonitor._build_change_message')
+    @patch('file_monitor.monitor.FileChangeMonitor.audit_change_log')
+    def test_flush_survives_vanished_files(self,
+                                           mock_audit_change_log,
+                                           mock_build_change_message):
+        """Test that a file deleted before the flush does not kill processing."""
+        mock_event = MagicMock()
+        mock_event.is_directory = False
+        mock_event.src_path = "gone.txt"
+        mock_build_change_message.side_effect = FileNotFoundError
+
+        self.handler.on_modified(mock_event)
+        self.handler._flush_due_events(now=time.monotonic() + self.handler.debounce_window)
+
+        self.mock_broker.publish_many.assert_not_called()
+        mock_audit_change_log.assert_called_once()
+
+        # A later valid modification must still be delivered.
+        mock_build_change_message.side_effect = None
+        mock_build_change_message.return_value = ("file.txt", "payload")
+        mock_event.src_path = "file.txt"
+        self.handler.on_modified(mock_event)
+        self.handler._flush_due_events(now=time.monotonic() + self.handler.debounce_window)
+
+        self.mock_broker.publish_many.assert_called_once_with([("file.txt", "payload")])
+
+    @patch('file_monitor.monitor.FileChangeMonitor._build_change_message',
+           return_value=("file.txt", "payload"))
+    @patch('file_monitor.monitor.FileChangeMonitor.audit_change_log')
+    def test_on_modified_coalesces_bursts(self,
+                                          mock_audit_change_log,
+                                          mock_build_change_message):
+        """Test that a burst of events for one path runs the pipeline once."""
+        mock_event = MagicMock()
+        mock_event.is_directory = False
+        mock_event.src_path = "file.txt"
+
+        for _ in range(5):
+            self.handler.on_modified(mock_event)
+        self.handler._flush_due_events(now=time.monotonic() + self.handler.debounce_window)
+
+        mock_build_change_message.assert_called_once()
+        self.mock_broker.publish_many.assert_called_once()
+        mock_audit_change_log.assert_called_once()
+
+    @patch('file_monitor.monitor.FileChangeMonitor._build_change_message',
+           return_value=("file.txt", "payload"))
+    @patch('file_monitor.monitor.FileChangeMonitor.audit_change_log')
+    def test_close_flushes_pending_events(self,
+                                          mock_audit_change_log,
+                                          mock_build_change_message):
+        """Test that close publishes events still inside the debounce window."""
+        mock_event = MagicMock()
+        mock_event.is_directory = False
+        mock_event.src_path = "file.txt"
+
+        self.handler.on_modified(mock_event)
+        self.handler.close()
+
+        self.mock_broker.publish_many.assert_called_once_with([("file.txt", "payload")])
+        mock_audit_change_log.assert_called_once()
+
+    @patch('file_monitor.monitor.threading.Thread')
+    @patch('file_monitor.monitor.os.close')
+    @patch('file_monitor.monitor.os.writev')
+    @patch('file_monitor.monitor.os.open', return_value=3)
+    def test_audit_change_log(self, mock_os_open, mock_writev, mock_os_close,
+                              mock_thread):
+        """Test that audit_change_log queues the correct entry for the log file."""
         timestamp = "2024-12-06 12:30:45"
         file_path = "file.txt"
 
         self.handler.audit_change_log(timestamp, file_path)
+        self.handler.close()
+
+        mock_os_open.assert_called_once_with(self.handler.audit_log_path,
+                                             os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                                             0o644)
+        mock_writev.assert_called_once_with(3, [f"{timestamp}, {file_path}\n".encode('utf-8')])
+        mock_os_close.assert_called_once_with(3)
+
+    @patch('file_monitor.monitor.threading.Thread')
+    @patch('file_monitor.monitor.os.close')
+    @patch('file_monitor.monitor.os.writev')
+    @patch('file_monitor.monitor.os.open', return_value=3)
+    def test_audit_change_log_batches_writes(self, mock_os_open, mock_writev,
+                                             mock_os_close, mock_thread):
+        """Test that queued entries are submitted in a single writev."""
+        for i in range(self.handler.audit_flush_every):
+            self.handler.audit_change_log("2024-12-06 12:30:45", f"file{i}.txt")
+        self.handler.close()
+
+        mock_os_open.assert_called_once()
+        mock_writev.assert_called_once()
+        self.assertEqual(len(mock_writev.call_args[0][1]),
+                         self.handler.audit_flush_every)
+
+    @patch('file_monitor.monitor.threading.Thread')
+    @patch('file_monitor.monitor.os.close')
+    @patch('file_monitor.monitor.os.writev')
+    @patch('file_monitor.monitor.os.open', return_value=3)
+    def test_audit_write_chunks_oversized_batches(self, mock_os_open, mock_writev,
+                                                  mock_os_close, mock_thread):
+        """Test that a drained queue larger than one batch is written in chunks."""
+        for i in range(self.handler.audit_flush_every + 1):
+            self.handler.audit_change_log("2024-12-06 12:30:45", f"file{i}.txt")
+        self.handler.close()
+
+        self.assertEqual(mock_writev.call_count, 2)
+        self.assertEqual(len(mock_writev.call_args_list[0][0][1]),
+                         self.handler.audit_flush_every)
+        self.assertEqual(len(mock_writev.call_args_list[1][0][1]), 1)
+
+    def test_audit_change_log_starts_writer_thread(self):
+        """Test that the first audit entry starts the writer thread."""
+        with patch('file_monitor.monitor.threading.Thread') as mock_thread:
+            self.handler.audit_change_log("2024-12-06 12:30:45", "file.txt")
+            self.handler.audit_change_log("2024-12-06 12:30:45", "file.txt")
+
+        mock_thread.assert_called_once_with(target=self.handler._audit_worker,
+                                            daemon=True)
+        mock_thread.return_value.start.assert_called_once()
+        # Drain the queue so the atexit close hook has nothing to write.
+        while not self.handler._audit_q.empty():
+            self.handler._audit_q.get_nowait()
+
+    @patch('file_monitor.monitor.os.writev')
+    @patch('file_monitor.monitor.os.open')
+    def test_close_without_entries_does_not_open_log(self, mock_os_open, mock_writev):
+        """Test that close is a no-op when no entries were batched."""
+        self.handler.close()
 
-        mock_open.assert_called_once_with(self.handler.audit_log_path, "a", encoding='utf-8')
-        mock_open().write.assert_called_once_with(f"{timestamp}, {file_path}\n")
+        mock_os_open.assert_not_called()
+        mock_writev.assert_not_called()